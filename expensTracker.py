@@ -1,11 +1,14 @@
 import os
-import csv
 import pandas as pd
 from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QWidget, QPushButton, QLabel, QVBoxLayout,
                              QTableWidget, QTableWidgetItem, QFileDialog, QLineEdit,
-                             QComboBox, QHBoxLayout)
+                             QComboBox, QHBoxLayout, QMessageBox)
 from PyQt6.QtCore import Qt
+from expenseHistory import EditHistory
+from monthCodec import read_month, update_days
+from recurringBills import create_month, load_rules
+from expenseBackup import snapshot
 
 # File storage location
 DATA_DIR = r"C:\Users\User\OneDrive\Desktop\HomeExpense"
@@ -22,20 +25,18 @@ def create_monthly_csv(year, month):
         os.makedirs(DATA_DIR)
     
     if not os.path.exists(file_path):
-        with open(file_path, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(COLUMNS)
-            for day in range(1, 32):
-                try:
-                    date = datetime(year, month, day)
-                    writer.writerow([date.strftime('%Y-%m-%d'), date.strftime('%A')] + [0] * (len(COLUMNS) - 2))
-                except ValueError:
-                    break
+        try:
+            rules = load_rules(DATA_DIR)
+        except ValueError:
+            rules = []  # A broken rules file must not stop the month from being created
+        create_month(file_path, year, month, rules)  # Upcoming recurring bills are filled in
     return file_path
 
 class HomeExpenseApp(QWidget):
     def __init__(self):
         super().__init__()
+        self.history = EditHistory(DATA_DIR)
+        snapshot(DATA_DIR)  # Back up the month files as they were at start-up
         self.init_ui()
     
     def init_ui(self):
@@ -52,6 +53,10 @@ class HomeExpenseApp(QWidget):
         # Buttons
         self.load_button = QPushButton("Load Expenses")
         self.load_button.clicked.connect(self.load_expenses)
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.clicked.connect(self.undo_edit)
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.clicked.connect(self.redo_edit)
         
         self.table = QTableWidget()
         
@@ -62,6 +67,8 @@ class HomeExpenseApp(QWidget):
         select_layout.addWidget(QLabel("Month:"))
         select_layout.addWidget(self.month_box)
         select_layout.addWidget(self.load_button)
+        select_layout.addWidget(self.undo_button)
+        select_layout.addWidget(self.redo_button)
         
         layout.addLayout(select_layout)
         layout.addWidget(self.table)
@@ -74,20 +81,24 @@ class HomeExpenseApp(QWidget):
         month = self.month_box.currentIndex() + 1
         file_path = create_monthly_csv(year, month)
         
-        df = pd.read_csv(file_path, na_values=['-'])
+        try:
+            df = read_month(file_path)
+        except ValueError as error:
+            QMessageBox.warning(self, "Home Expense Tracker", f"Not loaded: {error}")
+            return
         self.populate_table(df, file_path)
     
     def populate_table(self, df, file_path):
         """Populates the table with CSV data."""
         self.table.clear()
-        self.table.setRowCount(df.shape[0])
+        self.table.setRowCount(df.shape[0] + 1)  # Day rows plus the TOTAL row
         self.table.setColumnCount(df.shape[1])
         self.table.setHorizontalHeaderLabels(df.columns)
 
         # Disconnect only if connected
         try:
-            self.table.itemChanged.disconnect(self.save_changes)
-        except TypeError:
+            self.table.itemChanged.disconnect(self.save_slot)
+        except (AttributeError, TypeError):
             pass  # Ignore if not connected
 
         for row in range(df.shape[0]):
@@ -96,42 +107,86 @@ class HomeExpenseApp(QWidget):
                 if col > 1:  # Make expense fields editable
                     item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
                 self.table.setItem(row, col, item)
+
+        # TOTAL row, computed from the day rows and not editable
+        for col in range(df.shape[1]):
+            item = QTableWidgetItem()
+            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            self.table.setItem(df.shape[0], col, item)
+        self.update_total_row(df)
         
-        self.table.itemChanged.connect(lambda: self.save_changes(df, file_path))  # Reconnect signal
+        self.save_slot = lambda: self.save_changes(df, file_path)
+        self.table.itemChanged.connect(self.save_slot)  # Reconnect signal
     
     def save_changes(self, df, file_path):
         """Saves changes made to the table."""
         self.table.blockSignals(True)  # Prevent recursive signals
         
+        # Collect the expense cells that differ from the loaded data
+        changes, edits = {}, []
         for row in range(df.shape[0]):
-            for col in range(df.shape[1]):
+            for col in range(2, len(COLUMNS) - 2):
                 item = self.table.item(row, col)
                 if item:
                     try:
-                        df.iloc[row, col] = float(item.text()) if col > 1 else item.text()
+                        value = float(item.text())
                     except ValueError:
-                        df.iloc[row, col] = 0  # Convert invalid values to 0
+                        value = 0.0  # Convert invalid values to 0
+                    old_value = df.iloc[row, col]
+                    if value != old_value and not (pd.isna(value) and pd.isna(old_value)):
+                        date = df.iloc[row, 0]
+                        changes.setdefault(date, {})[COLUMNS[col]] = value
+                        edits.append((date, COLUMNS[col], old_value, value))
+                        df.iloc[row, col] = value
         
-        # Calculate total per row, ensuring safe numeric conversion
-        for i in range(len(df)):
+        # Save only the changed days back to CSV and show their new totals
+        if changes:
             try:
-                numeric_values = pd.to_numeric(df.iloc[i, 2:-2], errors='coerce').fillna(0)  # Convert to float safely
-                total_aed = numeric_values.sum()
-                df.iloc[i, -2] = total_aed
-                df.iloc[i, -1] = total_aed * AED_TO_INR
-            except ValueError:
-                continue
-        
-        # Ensure final row has correct column count
-        total_row = ["TOTAL", "-"] + [pd.to_numeric(df.iloc[:, i], errors='coerce').fillna(0).sum() if i > 1 else "-" for i in range(len(COLUMNS))]
-        total_row = total_row[:len(COLUMNS)]  # Ensure it matches column length
-        df.loc[len(df)] = total_row  # Append total row
-
-        # Save changes back to CSV
-        df.to_csv(file_path, index=False)
+                totals = update_days(file_path, changes)
+            except (OSError, ValueError) as error:
+                self.table.blockSignals(False)
+                QMessageBox.warning(self, "Home Expense Tracker", f"Not saved: {error}")
+                return
+            self.history.record(edits)  # One undoable step per save, now that it is on disk
+            for row in range(df.shape[0]):
+                if df.iloc[row, 0] in totals:
+                    total_aed, total_inr = totals[df.iloc[row, 0]]
+                    df.iloc[row, -2], df.iloc[row, -1] = total_aed, total_inr
+                    self.table.item(row, len(COLUMNS) - 2).setText(str(total_aed))
+                    self.table.item(row, len(COLUMNS) - 1).setText(str(total_inr))
+            self.update_total_row(df)
 
         self.table.blockSignals(False)  # Re-enable signals
 
+    def update_total_row(self, df):
+        """Fills the read-only TOTAL row with the month's column sums."""
+        totals = ["TOTAL", "-"] + [str(df[col].sum()) for col in COLUMNS[2:]]
+        for col, text in enumerate(totals):
+            self.table.item(df.shape[0], col).setText(text)
+
+    def closeEvent(self, event):
+        """Backs up the month files before closing."""
+        snapshot(DATA_DIR)
+        super().closeEvent(event)
+
+    def undo_edit(self):
+        """Reverts the most recent save and reloads the table."""
+        self.apply_history_change(self.history.undo, "undo")
+
+    def redo_edit(self):
+        """Reapplies the most recently undone save and reloads the table."""
+        self.apply_history_change(self.history.redo, "redo")
+
+    def apply_history_change(self, step, action):
+        """Runs an undo/redo step, reporting a month file that could not be written."""
+        try:
+            batch = step()
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, "Home Expense Tracker", f"Could not {action}: {error}")
+            return
+        if batch:
+            self.load_expenses()
+
 if __name__ == '__main__':
     app = QApplication([])
     window = HomeExpenseApp()
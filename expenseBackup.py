@@ -0,0 +1,151 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from monthCodec import MTIME_SLACK_NS, month_files
+from expenseHistory import EditHistory
+
+# File storage location
+DATA_DIR = r"C:\Users\User\OneDrive\Desktop\HomeExpense"
+STORE_DIR = ".snapshots"
+SNAPSHOT_ID = "%Y%m%dT%H%M%S%f"
+
+def _store(data_dir, *parts):
+    return os.path.join(data_dir, STORE_DIR, *parts)
+
+def _object_path(data_dir, digest):
+    return _store(data_dir, "objects", digest[:2], f"{digest}.gz")
+
+def _write_atomic(file_path, data):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, file_path)
+
+def list_snapshots(data_dir):
+    """Returns the snapshot ids in the store, oldest first."""
+    manifest_dir = _store(data_dir, "manifests")
+    if not os.path.isdir(manifest_dir):
+        return []
+    return sorted(name[:-5] for name in os.listdir(manifest_dir) if name.endswith(".json"))
+
+def load_manifest(data_dir, snapshot_id):
+    """Returns {file name: {"sha256", "size", "mtime_ns", "checked_ns"}} for a snapshot."""
+    with open(_store(data_dir, "manifests", f"{snapshot_id}.json")) as file:
+        return json.load(file)["files"]
+
+def find_snapshot(data_dir, when):
+    """Returns the id of the latest snapshot taken at or before `when`, or None."""
+    cutoff = when.strftime(SNAPSHOT_ID)
+    earlier = [snapshot_id for snapshot_id in list_snapshots(data_dir) if snapshot_id <= cutoff]
+    return earlier[-1] if earlier else None
+
+def snapshot(data_dir):
+    """Stores every changed month file and records a manifest for this point in time.
+
+    Files whose size and modification time match the previous manifest reuse
+    its hash without being read, unless they were modified within the mtime
+    resolution of when that hash was taken (a same-size save in the same
+    timestamp tick would otherwise go unnoticed). Each distinct file content is
+    stored once, gzip-compressed under its SHA-256. Returns the new snapshot
+    id, or the previous one if nothing changed.
+    """
+    snapshots = list_snapshots(data_dir)
+    previous = load_manifest(data_dir, snapshots[-1]) if snapshots else {}
+
+    files = {}
+    for file_path in month_files(data_dir).values():
+        name = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        known = previous.get(name)
+        if (known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns
+                and stat.st_mtime_ns + MTIME_SLACK_NS < known.get("checked_ns", 0)):
+            files[name] = known
+            continue
+
+        checked_ns = time.time_ns()
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(_object_path(data_dir, digest)):
+            _write_atomic(_object_path(data_dir, digest), gzip.compress(data))
+        files[name] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                       "checked_ns": checked_ns}
+
+    contents = {name: entry["sha256"] for name, entry in files.items()}
+    if snapshots and contents == {name: entry["sha256"] for name, entry in previous.items()}:
+        if files != previous:
+            # Same contents with new timestamps; refresh them so later runs can skip hashing
+            _write_manifest(data_dir, snapshots[-1], files)
+        return snapshots[-1]
+
+    snapshot_id = datetime.now().strftime(SNAPSHOT_ID)
+    _write_manifest(data_dir, snapshot_id, files)
+    return snapshot_id
+
+def _write_manifest(data_dir, snapshot_id, files):
+    manifest = {"created": datetime.strptime(snapshot_id, SNAPSHOT_ID).isoformat(), "files": files}
+    _write_atomic(_store(data_dir, "manifests", f"{snapshot_id}.json"), json.dumps(manifest, indent=1).encode())
+
+def restore(data_dir, snapshot_id, names=None):
+    """Restores month files to their content in a snapshot.
+
+    Restores only the given file names if `names` is set; otherwise the whole
+    directory is restored, removing month files created after the snapshot.
+    The current state is snapshotted first so a restore can itself be undone,
+    and the edit history is cleared so an Undo cannot write pre-restore values
+    over the restored months. Raises ValueError, before anything is written,
+    if a name is not part of the snapshot. Returns the names of the files that changed.
+    """
+    manifest = load_manifest(data_dir, snapshot_id)
+    missing = [name for name in names or [] if name not in manifest]
+    if missing:
+        raise ValueError(f"Not in snapshot {snapshot_id}: {', '.join(missing)}")
+    current = load_manifest(data_dir, snapshot(data_dir))
+
+    changed = []
+    for name in (names if names is not None else manifest):
+        digest = manifest[name]["sha256"]
+        if current.get(name, {}).get("sha256") == digest:
+            continue
+        with open(_object_path(data_dir, digest), 'rb') as file:
+            _write_atomic(os.path.join(data_dir, name), gzip.decompress(file.read()))
+        changed.append(name)
+
+    if names is None:
+        for name in set(current) - set(manifest):
+            os.remove(os.path.join(data_dir, name))
+            changed.append(name)
+    if changed:
+        EditHistory(data_dir).clear()
+    return changed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Snapshot and restore the expense month files.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("snapshot", help="store changed month files and record a snapshot")
+    commands.add_parser("list", help="list the snapshot ids")
+    restore_parser = commands.add_parser("restore", help="restore month files from a snapshot")
+    target = restore_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--id", dest="snapshot_id", help="snapshot id, as printed by list")
+    target.add_argument("--at", type=lambda value: datetime.strptime(value, "%Y-%m-%d %H:%M"),
+                        help='restore the latest snapshot taken at or before "YYYY-MM-DD HH:MM"')
+    restore_parser.add_argument("names", nargs="*", help="month files to restore, e.g. 2024_March.csv (default: all)")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        print(snapshot(args.data_dir))
+    elif args.command == "list":
+        for snapshot_id in list_snapshots(args.data_dir):
+            print(snapshot_id)
+    else:
+        snapshot_id = args.snapshot_id or find_snapshot(args.data_dir, args.at)
+        if snapshot_id is None:
+            parser.exit(1, f"No snapshot taken at or before {args.at:%Y-%m-%d %H:%M}\n")
+        for name in restore(args.data_dir, snapshot_id, args.names or None):
+            print(f"Restored {name}")
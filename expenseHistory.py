@@ -0,0 +1,152 @@
+import os
+import csv
+import math
+from datetime import datetime
+from monthCodec import update_days
+
+HISTORY_FILE = "edit_history.log"
+
+# Log record types: a batch marker opens one save's edits, each edit carries
+# (date, category, old, new), undo/redo are bare markers, and a clear marker
+# drops everything before it (e.g. after the month files were restored)
+BATCH, EDIT, UNDO, REDO, CLEAR = "B", "E", "U", "R", "X"
+
+def to_amount(value):
+    """Converts a cell value to a float, treating blanks and invalid input as 0."""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(amount) else amount
+
+def month_file_for(data_dir, date):
+    """Returns the month CSV path holding the given 'YYYY-MM-DD' date."""
+    day = datetime.strptime(date, '%Y-%m-%d')
+    return os.path.join(data_dir, f"{day.year}_{day.strftime('%B')}.csv")
+
+def apply_changes(data_dir, cells):
+    """Writes (date, category, value) cells back to their month files, one write per file.
+
+    Raises FileNotFoundError, before writing anything, if a month file is missing.
+    """
+    files = {}
+    for date, category, value in cells:
+        files.setdefault(month_file_for(data_dir, date), {}).setdefault(date, {})[category] = value
+    for file_path in files:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"{os.path.basename(file_path)} no longer exists")
+    for file_path, changes in files.items():
+        update_days(file_path, changes)
+
+class EditHistory:
+    """Unlimited undo/redo backed by an append-only log of per-cell edits.
+
+    Only the changed cells are written per save, so the log grows with the
+    number of edits rather than with the size of the month files. The cells
+    changed by one save form a batch that is undone and redone as a whole. The
+    undo/redo position is rebuilt on start-up by replaying the log once.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.log_path = os.path.join(data_dir, HISTORY_FILE)
+        self.edits = []  # One list of (date, category, old, new) per batch
+        self.position = 0
+        self._replay()
+
+    def _replay(self):
+        """Rebuilds the batch stack and cursor from the log file, skipping unreadable rows."""
+        if not os.path.exists(self.log_path):
+            return
+        batch_open = False
+        with open(self.log_path, newline='') as file:
+            for row in csv.reader(file):
+                if not row:
+                    continue
+                if row[0] == BATCH:
+                    del self.edits[self.position:]
+                    self.edits.append([])
+                    self.position += 1
+                    batch_open = True
+                elif row[0] == EDIT and len(row) == 5:
+                    try:
+                        edit = (row[1], row[2], float(row[3]), float(row[4]))
+                    except ValueError:
+                        continue
+                    if not batch_open:
+                        del self.edits[self.position:]
+                        self.edits.append([])
+                        self.position += 1
+                        batch_open = True
+                    self.edits[-1].append(edit)
+                elif row[0] == UNDO and self.position > 0:
+                    self.position -= 1
+                    batch_open = False
+                elif row[0] == REDO and self.position < len(self.edits):
+                    self.position += 1
+                    batch_open = False
+                elif row[0] == CLEAR:
+                    self.edits, self.position = [], 0
+                    batch_open = False
+        # A batch whose edits were all unreadable cannot be undone or redone
+        kept = [i for i, batch in enumerate(self.edits) if batch]
+        self.position = sum(1 for i in kept if i < self.position)
+        self.edits = [self.edits[i] for i in kept]
+
+    def _append(self, *rows):
+        """Appends records to the log."""
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, 'a', newline='') as file:
+            csv.writer(file).writerows(rows)
+
+    def record(self, edits):
+        """Records one save's (date, category, old, new) cell edits as a single undoable batch.
+
+        Unchanged cells are dropped, and anything that could have been redone is discarded.
+        """
+        batch = []
+        for date, category, old, new in edits:
+            old, new = to_amount(old), to_amount(new)
+            if old != new:
+                batch.append((date, category, old, new))
+        if not batch:
+            return
+        del self.edits[self.position:]
+        self.edits.append(batch)
+        self.position += 1
+        self._append([BATCH], *[[EDIT, *edit] for edit in batch])
+
+    def clear(self):
+        """Forgets every recorded edit, so nothing from before now can be undone or redone."""
+        self.edits, self.position = [], 0
+        self._append([CLEAR])
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.edits)
+
+    def undo(self):
+        """Restores the cells of the most recent batch and returns it, or None if there is none.
+
+        The month files are written before the step is logged, so a failed write
+        (e.g. a missing month file) raises and leaves the history unchanged.
+        """
+        if not self.can_undo():
+            return None
+        batch = self.edits[self.position - 1]
+        apply_changes(self.data_dir, [(date, category, old) for date, category, old, _ in reversed(batch)])
+        self.position -= 1
+        self._append([UNDO])
+        return batch
+
+    def redo(self):
+        """Reapplies the most recently undone batch and returns it, or None if there is none."""
+        if not self.can_redo():
+            return None
+        batch = self.edits[self.position]
+        apply_changes(self.data_dir, [(date, category, new) for date, category, _, new in batch])
+        self.position += 1
+        self._append([REDO])
+        return batch
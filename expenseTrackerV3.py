@@ -1,12 +1,16 @@
 import os
-import csv
-import threading
+import calendar
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import datetime
+from datetime import date, datetime
 from PyQt6.QtWidgets import (QApplication, QWidget, QPushButton, QLabel, QVBoxLayout, 
-                             QLineEdit, QComboBox, QHBoxLayout, QGridLayout, QFileDialog)
+                             QLineEdit, QComboBox, QHBoxLayout, QGridLayout, QFileDialog, QInputDialog)
 from PyQt6.QtCore import Qt
+from expenseHistory import EditHistory
+from monthCodec import BILL_CATEGORIES, read_month, write_day
+from recurringBills import create_month, fill_year, load_rules, save_rules
+from expenseTrends import ExpenseTrends
+from expenseBackup import SNAPSHOT_ID, list_snapshots, restore, snapshot
 
 # File storage location
 DATA_DIR = r"C:\Users\User\OneDrive\Desktop\HomeExpense"
@@ -23,21 +27,20 @@ def create_monthly_csv(year, month):
         os.makedirs(DATA_DIR)
     
     if not os.path.exists(file_path):
-        with open(file_path, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(COLUMNS)
-            for day in range(1, 32):
-                try:
-                    date = datetime(year, month, day)
-                    writer.writerow([date.strftime('%Y-%m-%d'), date.strftime('%A')] + [0] * (len(COLUMNS) - 2))
-                except ValueError:
-                    break
+        try:
+            rules = load_rules(DATA_DIR)
+        except ValueError:
+            rules = []  # A broken rules file must not stop the month from being created
+        create_month(file_path, year, month, rules)  # Upcoming recurring bills are filled in
     return file_path
 
 class HomeExpenseApp(QWidget):
     def __init__(self):
         super().__init__()
         self.expense_fields = {}
+        self.history = EditHistory(DATA_DIR)
+        self.trends = ExpenseTrends(DATA_DIR)
+        snapshot(DATA_DIR)  # Back up the month files as they were at start-up
         self.init_ui()
     
     def init_ui(self):
@@ -90,6 +93,31 @@ class HomeExpenseApp(QWidget):
         self.save_button.clicked.connect(self.save_expenses)
         self.layout.addWidget(self.save_button)
 
+        # Undo and Redo Buttons
+        history_layout = QHBoxLayout()
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.clicked.connect(self.undo_edit)
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.clicked.connect(self.redo_edit)
+        history_layout.addWidget(self.undo_button)
+        history_layout.addWidget(self.redo_button)
+        self.layout.addLayout(history_layout)
+
+        # Recurring Bill Buttons
+        recurring_layout = QHBoxLayout()
+        self.repeat_button = QPushButton("Repeat Monthly")
+        self.repeat_button.clicked.connect(self.repeat_monthly)
+        self.fill_year_button = QPushButton("Fill Recurring Bills for Year")
+        self.fill_year_button.clicked.connect(self.fill_recurring_year)
+        recurring_layout.addWidget(self.repeat_button)
+        recurring_layout.addWidget(self.fill_year_button)
+        self.layout.addLayout(recurring_layout)
+
+        # Button to restore month files from a snapshot
+        self.restore_button = QPushButton("Restore Snapshot")
+        self.restore_button.clicked.connect(self.restore_snapshot)
+        self.layout.addWidget(self.restore_button)
+
         self.total_label = QLabel("Total (AED): 0 | Total (INR): 0")
         self.total_label.setStyleSheet("font-weight: bold; font-size: 14px; padding: 5px;")
         self.layout.addWidget(self.total_label)
@@ -109,6 +137,11 @@ class HomeExpenseApp(QWidget):
         self.save_graph_button.clicked.connect(self.save_expense_graph)
         self.layout.addWidget(self.save_graph_button)
 
+        # Button to show spending trends and the month-end forecast
+        self.trends_button = QPushButton("Show Trends")
+        self.trends_button.clicked.connect(self.show_trends)
+        self.layout.addWidget(self.trends_button)
+
         # Status Label
         self.status_label = QLabel("")
         self.status_label.setStyleSheet("color: green; font-weight: bold;")
@@ -124,7 +157,11 @@ class HomeExpenseApp(QWidget):
         file_path = create_monthly_csv(year, month)
 
         # Load CSV data
-        df = pd.read_csv(file_path, na_values=['-'])
+        try:
+            df = read_month(file_path)
+        except ValueError as error:
+            self.status_label.setText(f"Not loaded: {error}")
+            return
 
         # Get selected date
         selected_date = f"{year}-{month:02d}-{day:02d}"
@@ -138,10 +175,9 @@ class HomeExpenseApp(QWidget):
             # Update total labels
             self.update_totals(float(latest_entry["Total (AED)"]), float(latest_entry["Total (INR)"]))
 
-        # Update monthly total
-        if "Total (AED)" in df.columns:
-            monthly_total = df["Total (AED)"].sum() - (df["Total (AED)"].sum())/2
-            self.monthly_total_label.setText(f"Monthly Expense (AED): {monthly_total:.2f}")
+        # Update monthly total (the TOTAL row is not part of the loaded days)
+        monthly_total = df["Total (AED)"].sum()
+        self.monthly_total_label.setText(f"Monthly Expense (AED): {monthly_total:.2f}")
 
     def save_expenses(self):
         year = int(self.year_box.currentText())
@@ -150,7 +186,11 @@ class HomeExpenseApp(QWidget):
         file_path = create_monthly_csv(year, month)
 
         # Read existing data
-        df = pd.read_csv(file_path)
+        try:
+            df = read_month(file_path)
+        except ValueError as error:
+            self.status_label.setText(f"Not saved: {error}")
+            return
 
         # Get selected date
         selected_date = f"{year}-{month:02d}-{day:02d}"
@@ -171,40 +211,128 @@ class HomeExpenseApp(QWidget):
         expense_data.append(total_aed)
         expense_data.append(total_inr)
 
-        # Update existing row for the selected date instead of deleting it
-        if selected_date in df["Date"].values:
-            df.loc[df["Date"] == selected_date, COLUMNS[2:]] = expense_data[2:]
-        else:
-            df.loc[len(df)] = expense_data  # Append new row if the date does not exist
-
-        # Ensure "TOTAL" is removed before recalculating
-        df = df[df["Date"] != "TOTAL"]
-
-        # Calculate total row values correctly
-        total_values = [df[col].sum() if col in df.columns and col not in ["Date", "Day"] else "-" for col in COLUMNS]
-        new_total_row = ["TOTAL", "-"] + total_values[2:]
-
-        # Append "TOTAL" at the bottom
-        df.loc[len(df)] = new_total_row
+        # Save only the selected day (and the TOTAL row)
+        amounts = dict(zip(COLUMNS[2:-2], expense_data[2:-2]))
+        try:
+            write_day(file_path, selected_date, amounts)
+        except (OSError, ValueError) as error:
+            self.status_label.setText(f"Not saved: {error}")
+            return
 
-        # Save in a separate thread to avoid UI freezing
-        threading.Thread(target=self.save_file, args=(df, file_path), daemon=True).start()
+        # Record the changed cells as one undoable step, now that they are on disk
+        if selected_date in df["Date"].values:
+            old_entry = df[df["Date"] == selected_date].iloc[0]
+            self.history.record([(selected_date, col, old_entry[col], value)
+                                 for col, value in zip(COLUMNS[2:-2], expense_data[2:])])
 
         # Update UI
         self.update_totals(total_aed, total_inr)
         self.status_label.setText(f"Saved! Total (AED): {total_aed:.2f} | Total (INR): {total_inr:.2f}")
 
+    def undo_edit(self):
+        """Reverts the most recent save."""
+        self.apply_history_change(self.history.undo, "Undo")
+
+    def redo_edit(self):
+        """Reapplies the most recently undone save."""
+        self.apply_history_change(self.history.redo, "Redo")
+
+    def apply_history_change(self, step, action):
+        """Runs an undo/redo step against the month files and refreshes the form."""
+        try:
+            batch = step()
+        except (OSError, ValueError) as error:
+            self.status_label.setText(f"Could not {action.lower()}: {error}")
+            return
+        if not batch:
+            self.status_label.setText(f"Nothing to {action.lower()}")
+            return
+
+        self.load_expenses()
+        dates = sorted({date for date, _, _, _ in batch})
+        self.status_label.setText(f"{action}: {len(batch)} change(s) on {', '.join(dates)}")
+
+    def repeat_monthly(self):
+        """Turns the bill amounts in the form into bills that recur on the selected day every month."""
+        year = int(self.year_box.currentText())
+        month = self.month_box.currentIndex() + 1
+        day = int(self.day_box.currentText())
+
+        try:
+            rules = load_rules(DATA_DIR)
+        except ValueError as error:
+            self.status_label.setText(f"Recurring bills not loaded: {error}")
+            return
+
+        # Day 31 still recurs on the 31st, but starts on the last day of a shorter month
+        start = date(year, month, min(day, calendar.monthrange(year, month)[1]))
+        added = []
+        for col in BILL_CATEGORIES:
+            try:
+                amount = float(self.expense_fields[col].text().strip() or 0)
+            except ValueError:
+                continue
+            if amount:
+                # A bill recurs once, so this replaces any earlier rule for the category
+                rules = [r for r in rules if r["Category"] != col]
+                rules.append({"Category": col, "Amount": amount, "Day": day, "Interval": None,
+                              "Start": start, "End": None})
+                added.append(col)
+
+        save_rules(DATA_DIR, rules)
+        self.status_label.setText(f"Recurring on day {day}: {', '.join(added)}" if added else "No bill amounts to repeat")
+
+    def fill_recurring_year(self):
+        """Writes the recurring bills into every month of the selected year."""
+        year = int(self.year_box.currentText())
+        snapshot(DATA_DIR)
+        try:
+            written = fill_year(DATA_DIR, year)
+        except ValueError as error:
+            self.status_label.setText(f"Recurring bills not loaded: {error}")
+            return
+        self.load_expenses()
+        self.status_label.setText(f"Filled recurring bills on {written} days of {year}")
+
+    def restore_snapshot(self):
+        """Restores the selected month, or every month, from a chosen snapshot."""
+        snapshot_ids = list_snapshots(DATA_DIR)[::-1]
+        if not snapshot_ids:
+            self.status_label.setText("No snapshots yet")
+            return
+        labels = [datetime.strptime(s, SNAPSHOT_ID).strftime('%Y-%m-%d %H:%M:%S') for s in snapshot_ids]
+        label, ok = QInputDialog.getItem(self, "Restore Snapshot", "Snapshot:", labels, 0, False)
+        if not ok:
+            return
+
+        month_file = f"{self.year_box.currentText()}_{self.month_box.currentText()}.csv"
+        scope, ok = QInputDialog.getItem(self, "Restore Snapshot", "Restore:", [month_file, "All months"], 0, False)
+        if not ok:
+            return
+
+        try:
+            changed = restore(DATA_DIR, snapshot_ids[labels.index(label)], None if scope == "All months" else [month_file])
+        except ValueError as error:
+            self.status_label.setText(f"Not restored: {error}")
+            return
+        self.history = EditHistory(DATA_DIR)  # Restore cleared the edit history on disk
+        self.load_expenses()
+        self.status_label.setText(f"Restored {len(changed)} file(s) from {label}")
+
     def show_expense_graph(self):
         """Generates and displays the bar graph of daily expenses for the selected month."""
         year = int(self.year_box.currentText())
         month = self.month_box.currentIndex() + 1
         file_path = create_monthly_csv(year, month)
 
-        df = pd.read_csv(file_path)
-        df = df[df["Date"] != "TOTAL"]  # Remove TOTAL row if exists
+        try:
+            df = read_month(file_path)  # TOTAL row is skipped by the reader
+        except ValueError as error:
+            self.status_label.setText(f"Graph not shown: {error}")
+            return
 
         plt.figure(figsize=(10, 5))
-        plt.bar(df["Date"], df["Total (AED)"].astype(float), color='blue')
+        plt.bar(df["Date"], df["Total (AED)"], color='blue')
         plt.xlabel("Date")
         plt.ylabel("Total Expense (AED)")
         plt.title(f"Daily Expenses for {self.month_box.currentText()} {year}")
@@ -212,9 +340,47 @@ class HomeExpenseApp(QWidget):
         plt.tight_layout()
         plt.show()
     
-    def save_file(self, df, file_path):
-        """Save the DataFrame to CSV."""
-        df.to_csv(file_path, index=False)
+    def show_trends(self):
+        """Plots rolling daily averages and category changes for the selected month."""
+        year = int(self.year_box.currentText())
+        month = self.month_box.currentIndex() + 1
+
+        try:
+            days, daily = self.trends.daily_totals()
+        except ValueError as error:
+            self.status_label.setText(f"Trends not shown: {error}")
+            return
+        forecast = self.trends.forecast(year, month)
+        deltas = self.trends.month_deltas(year, month)
+        categories = COLUMNS[2:-2]
+
+        fig, (top, bottom) = plt.subplots(2, 1, figsize=(11, 8))
+        # One filled step area instead of a bar per day, so a decade of history draws quickly
+        top.fill_between(days, daily, step='mid', color='lightgray', label="Daily")
+        for window, color in ((7, 'blue'), (30, 'orange')):
+            top.plot(*self.trends.rolling_average(window), color=color, label=f"{window}-day average")
+        top.set_ylabel("Expense (AED)")
+        top.set_title("Daily Expenses")
+        top.legend()
+
+        positions = range(len(categories))
+        bottom.bar([p - 0.2 for p in positions], [deltas[c][0] for c in categories], width=0.4, label="vs last month")
+        bottom.bar([p + 0.2 for p in positions], [deltas[c][1] for c in categories], width=0.4, label="vs last year")
+        bottom.axhline(0, color='black', linewidth=0.8)
+        bottom.set_xticks(list(positions), categories, rotation=45, ha="right")
+        bottom.set_ylabel("Change (AED)")
+        bottom.set_title(f"{self.month_box.currentText()} {year}: spent {forecast['spent']:.2f}, "
+                         f"projected month-end {forecast['projected']:.2f} AED")
+        bottom.legend()
+
+        fig.tight_layout()
+        self.status_label.setText(f"Projected month-end (AED): {forecast['projected']:.2f}")
+        plt.show()
+
+    def closeEvent(self, event):
+        """Backs up the month files before closing."""
+        snapshot(DATA_DIR)
+        super().closeEvent(event)
 
     def update_totals(self, total_aed=0, total_inr=0):
         """Updates the total display."""
@@ -226,11 +392,14 @@ class HomeExpenseApp(QWidget):
         month = self.month_box.currentIndex() + 1
         file_path = create_monthly_csv(year, month)
 
-        df = pd.read_csv(file_path)
-        df = df[df["Date"] != "TOTAL"]
+        try:
+            df = read_month(file_path)
+        except ValueError as error:
+            self.status_label.setText(f"Graph not saved: {error}")
+            return
 
         plt.figure(figsize=(10, 5))
-        plt.bar(df["Date"], df["Total (AED)"].astype(float), color='blue')
+        plt.bar(df["Date"], df["Total (AED)"], color='blue')
         plt.xlabel("Date")
         plt.ylabel("Total Expense (AED)")
         plt.title(f"Daily Expenses for {self.month_box.currentText()} {year}")
@@ -0,0 +1,157 @@
+import os
+import time
+import calendar
+import numpy as np
+from datetime import date
+from monthCodec import COLUMNS, BILL_CATEGORIES, MTIME_SLACK_NS, month_files, read_month_arrays
+
+SERIES = COLUMNS[2:-1]  # Categories plus Total (AED), the columns tracked per month
+TOTAL = COLUMNS.index("Total (AED)") - 2
+BILLS = [COLUMNS.index(col) - 2 for col in BILL_CATEGORIES]
+
+class ExpenseTrends:
+    """Rolling averages, month deltas and month-end forecasts over every month file.
+
+    All month files are stacked into one date-sorted float64 array. A file is
+    re-read only when its size or modification time changes, or while its
+    modification time is within the mtime resolution of when it was last read
+    (a same-size save in the same timestamp tick would otherwise go unnoticed).
+    Derived results are cached until the contents change.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.values = np.empty((0, len(COLUMNS) - 2))
+        self._files = {}  # path -> (stamp, checked_ns, dates, values)
+        self._cache = {}
+
+    def refresh(self):
+        """Re-reads changed month files and returns True if the history changed."""
+        stamps = {}
+        for path in month_files(self.data_dir).values():
+            stat = os.stat(path)
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = bool(set(self._files) - set(stamps))
+        for path in set(self._files) - set(stamps):
+            del self._files[path]
+        for path, stamp in stamps.items():
+            cached = self._files.get(path)
+            if cached is not None and cached[0] == stamp and stamp[0] + MTIME_SLACK_NS < cached[1]:
+                continue
+            checked_ns = time.time_ns()
+            dates, _, values = read_month_arrays(path)
+            dates = np.array(dates, dtype='datetime64[D]')
+            if (cached is None or cached[0] != stamp or not np.array_equal(cached[2], dates)
+                    or not np.array_equal(cached[3], values, equal_nan=True)):
+                changed = True
+            self._files[path] = (stamp, checked_ns, dates, values)
+        if not changed:
+            return False
+
+        if self._files:
+            dates = np.concatenate([entry[2] for entry in self._files.values()])
+            values = np.vstack([entry[3] for entry in self._files.values()])
+            order = np.argsort(dates, kind='stable')
+            self.dates, self.values = dates[order], np.nan_to_num(values[order])
+        else:
+            self.dates = np.empty(0, dtype='datetime64[D]')
+            self.values = np.empty((0, len(COLUMNS) - 2))
+        self._cache = {}
+        return True
+
+    def _cached(self, key, compute):
+        self.refresh()
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def daily_totals(self, until=None):
+        """Returns (days, totals) on a gap-free daily timeline up to `until` (default today)."""
+        until = np.datetime64(until or date.today(), 'D')
+        return self._cached(("daily", until), lambda: self._daily_totals(until))
+
+    def _daily_totals(self, until):
+        keep = self.dates <= until
+        if not keep.any():
+            return np.empty(0, dtype='datetime64[D]'), np.empty(0)
+        dates, totals = self.dates[keep], self.values[keep, TOTAL]
+        start = dates[0]
+        days = np.arange(start, dates[-1] + 1)
+        daily = np.zeros(len(days))
+        np.add.at(daily, (dates - start).astype(int), totals)
+        return days, daily
+
+    def rolling_average(self, window, until=None):
+        """Returns (days, averages) of daily spend over a trailing `window` of days.
+
+        The first days of the history average over however many days exist so far.
+        """
+        until = np.datetime64(until or date.today(), 'D')
+        def compute():
+            days, daily = self.daily_totals(until)
+            sums = np.concatenate([[0.0], np.cumsum(daily)])
+            end = np.arange(1, len(daily) + 1)
+            start = np.maximum(end - window, 0)
+            return days, (sums[end] - sums[start]) / (end - start)
+        return self._cached(("rolling", window, until), compute)
+
+    def monthly_totals(self):
+        """Returns (months, totals) where totals has one row per calendar month and SERIES columns."""
+        return self._cached(("monthly",), self._monthly_totals)
+
+    def _monthly_totals(self):
+        if not len(self.dates):
+            return np.empty(0, dtype='datetime64[M]'), np.empty((0, len(SERIES)))
+        months = self.dates.astype('datetime64[M]')
+        first = months.min()
+        span = np.arange(first, months.max() + 1)
+        totals = np.zeros((len(span), len(SERIES)))
+        np.add.at(totals, (months - first).astype(int), self.values[:, :len(SERIES)])
+        return span, totals
+
+    def category_deltas(self, lag):
+        """Returns (months, deltas) of each month against `lag` months earlier (NaN when unknown).
+
+        Use lag=1 for month-over-month and lag=12 for year-over-year changes.
+        """
+        def compute():
+            months, totals = self.monthly_totals()
+            deltas = np.full(totals.shape, np.nan)
+            deltas[lag:] = totals[lag:] - totals[:-lag]
+            return months, deltas
+        return self._cached(("deltas", lag), compute)
+
+    def month_deltas(self, year, month):
+        """Returns {column: (month_over_month, year_over_year)} for one month."""
+        target = np.datetime64(f"{year}-{month:02d}", 'M')
+        rows = []
+        for lag in (1, 12):
+            months, deltas = self.category_deltas(lag)
+            match = deltas[months == target]
+            rows.append(match[0] if len(match) else np.full(len(SERIES), np.nan))
+        return {col: (float(rows[0][i]), float(rows[1][i])) for i, col in enumerate(SERIES)}
+
+    def forecast(self, year, month, today=None):
+        """Projects the month-end spend from the days entered so far.
+
+        Day-to-day spend up to `today` sets a daily run rate for the remaining
+        days. Fixed bills (BILL_CATEGORIES) are left out of that rate and count
+        once, as do amounts already entered for later days (e.g. scheduled
+        bills). Returns {"spent", "daily_rate", "projected"} in AED.
+        """
+        today = np.datetime64(today or date.today(), 'D')
+        def compute():
+            first = np.datetime64(f"{year}-{month:02d}-01", 'D')
+            days_in_month = calendar.monthrange(year, month)[1]
+            in_month = (self.dates >= first) & (self.dates < first + days_in_month)
+            totals = self.values[in_month, TOTAL]
+            variable = totals - self.values[in_month][:, BILLS].sum(axis=1)
+            past = self.dates[in_month] <= today
+            spent, scheduled = totals[past].sum(), totals[~past].sum()
+            elapsed = int(np.clip((today - first).astype(int) + 1, 0, days_in_month))
+            rate = variable[past].sum() / elapsed if elapsed else 0.0
+            projected = spent + rate * (days_in_month - elapsed) + scheduled
+            return {"spent": float(spent), "daily_rate": float(rate), "projected": float(projected)}
+        return self._cached(("forecast", year, month, today), compute)
@@ -0,0 +1,169 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+COLUMNS = ["Date", "Day", "Grocery", "Hotel", "Laundry", "College", "Bus", "Dewa", "Gas",
+           "Etisalat", "Elife", "Petrol", "Misc", "Total (AED)", "Total (INR)"]
+AED_TO_INR = 22.0  # Static conversion rate
+CATEGORIES = COLUMNS[2:-2]
+BILL_CATEGORIES = ["College", "Dewa", "Gas", "Etisalat", "Elife"]  # Fixed monthly bills
+DTYPES = {col: (object if col in ("Date", "Day") else np.float64) for col in COLUMNS}
+
+MTIME_SLACK_NS = 2_000_000_000  # Coarsest common mtime resolution (FAT), in nanoseconds
+
+MONTH_FILE = re.compile(r"^(\d{4})_([A-Za-z]+)\.csv$")
+HEADER = ",".join(COLUMNS).encode()
+BOM = b"\xef\xbb\xbf"  # Added by Excel when it saves a CSV as UTF-8
+MISSING = (b"", b"-", b"nan")  # Placeholders read as NaN, like pd.read_csv(na_values=['-'])
+
+def month_files(data_dir):
+    """Returns {(year, month): path} for every month CSV in the data directory."""
+    files = {}
+    if not os.path.isdir(data_dir):
+        return files
+    for entry in os.scandir(data_dir):
+        match = MONTH_FILE.match(entry.name)
+        if not match:
+            continue
+        try:
+            month = datetime.strptime(match.group(2), '%B').month
+        except ValueError:
+            continue
+        files[(int(match.group(1)), month)] = entry.path
+    return files
+
+def _parse(data, file_path):
+    """Parses month file bytes into (lines, day_index, total_index, dates, days, values).
+
+    All numeric cells are split in one pass and converted to float64 in a
+    single array cast, so no per-cell type inference takes place. Every row
+    must have exactly len(COLUMNS) fields, so a stray or missing comma cannot
+    shift amounts into another day or category.
+    """
+    lines = data.splitlines(keepends=True)
+    if not lines or lines[0].rstrip(b"\r\n").removeprefix(BOM) != HEADER:
+        raise ValueError(f"{file_path} does not use the month file layout")
+
+    width = len(COLUMNS) - 2
+    day_index, total_index, dates, days, rest = [], None, [], [], []
+    for i in range(1, len(lines)):
+        body = lines[i].rstrip(b"\r\n")
+        if not body:
+            continue
+        fields = body.split(b",", 2)
+        if len(fields) != 3 or fields[2].count(b",") != width - 1:
+            raise ValueError(f"{file_path} line {i + 1} does not have {len(COLUMNS)} fields")
+        if fields[0] == b"TOTAL":
+            total_index = i
+            continue
+        day_index.append(i)
+        dates.append(fields[0].decode())
+        days.append(fields[1].decode())
+        rest.append(fields[2])
+
+    cells = b",".join(rest).split(b",") if rest else []
+    if any(cell in MISSING for cell in set(cells)):
+        cells = [b"nan" if cell in MISSING else cell for cell in cells]
+    values = np.array(cells, dtype=bytes).astype(np.float64).reshape(-1, width)
+    return lines, day_index, total_index, dates, days, values
+
+def read_month_arrays(file_path):
+    """Reads a month file into (dates, days, values) with values as a float64 array.
+
+    The TOTAL row is skipped and the columns of `values` follow COLUMNS[2:].
+    """
+    with open(file_path, "rb") as file:
+        _, _, _, dates, days, values = _parse(file.read(), file_path)
+    return dates, days, values
+
+def read_month(file_path):
+    """Reads the day rows of a month file into a DataFrame typed by DTYPES."""
+    dates, days, values = read_month_arrays(file_path)
+    data = dict(zip(COLUMNS, [dates, days] + list(values.T)))
+    return pd.DataFrame({col: np.asarray(data[col], dtype=DTYPES[col]) for col in COLUMNS})
+
+def _format_amount(value):
+    """Encodes an amount in its shortest form, writing whole numbers without a fraction."""
+    if np.isnan(value):
+        return b""
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value)).encode()
+    return repr(float(value)).encode()
+
+def _encode_row(first, second, values, newline):
+    return b",".join([first, second] + [_format_amount(v) for v in values]) + newline
+
+def update_days(file_path, changes):
+    """Applies {date: {category: amount}} to a month file and refreshes the totals.
+
+    Day and TOTAL rows are patched in place when the re-encoded rows have
+    exactly their old byte width; otherwise the file is rewritten to a
+    temporary file and swapped in. Returns {date: (total_aed, total_inr)} for the changed days.
+    """
+    with open(file_path, "rb") as file:
+        data = file.read()
+    lines, day_index, total_index, dates, days, values = _parse(data, file_path)
+    newline = lines[0][len(lines[0].rstrip(b"\r\n")):] or b"\n"
+
+    appended = []
+    for date, amounts in changes.items():
+        if date in dates:
+            i = dates.index(date)
+        else:
+            dates.append(date)
+            days.append(datetime.strptime(date, "%Y-%m-%d").strftime("%A"))
+            values = np.vstack([values, np.zeros(len(COLUMNS) - 2)])
+            i = len(dates) - 1
+            appended.append(i)
+        for category, amount in amounts.items():
+            values[i, COLUMNS.index(category) - 2] = amount
+        values[i, -2] = np.nansum(values[i, :-2])
+        values[i, -1] = values[i, -2] * AED_TO_INR
+
+    totals = np.nansum(values, axis=0)
+    changed = sorted(dates.index(date) for date in changes)
+    result = {dates[i]: (float(values[i, -2]), float(values[i, -1])) for i in changed}
+
+    # Fast path: every changed row (and the TOTAL row) keeps its byte width
+    patches = []
+    if not appended and total_index is not None:
+        targets = [(day_index[i], dates[i].encode(), days[i].encode(), values[i]) for i in changed]
+        targets.append((total_index, b"TOTAL", b"-", totals))
+        offsets = np.cumsum([0] + [len(line) for line in lines])
+        for line_no, first, second, row_values in targets:
+            offset, old_line = int(offsets[line_no]), lines[line_no]
+            line_end = old_line[len(old_line.rstrip(b"\r\n")):]
+            line = _encode_row(first, second, row_values, line_end)
+            if len(line) != len(old_line):
+                patches = []
+                break
+            patches.append((offset, line))
+    if patches:
+        with open(file_path, "r+b") as file:
+            for offset, line in patches:
+                file.seek(offset)
+                file.write(line)
+        return result
+
+    # Slow path: stream every row to a temporary file, then swap it in
+    write_month(file_path, dates, days, values, newline)
+    return result
+
+def write_month(file_path, dates, days, values, newline=os.linesep.encode()):
+    """Streams day rows plus a fresh TOTAL row to a temporary file and swaps it in.
+
+    `values` holds one row per date with the columns of COLUMNS[2:].
+    """
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER + newline)
+        for i in range(len(dates)):
+            file.write(_encode_row(dates[i].encode(), days[i].encode(), values[i], newline))
+        file.write(_encode_row(b"TOTAL", b"-", np.nansum(values, axis=0), newline))
+    os.replace(temp_path, file_path)
+
+def write_day(file_path, date, amounts):
+    """Saves the category amounts for one day and returns its (total_aed, total_inr)."""
+    return update_days(file_path, {date: amounts})[date]
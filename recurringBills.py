@@ -0,0 +1,149 @@
+import os
+import csv
+import calendar
+import numpy as np
+from datetime import date, datetime, timedelta
+from monthCodec import COLUMNS, CATEGORIES, AED_TO_INR, read_month_arrays, update_days, write_month
+
+RULES_FILE = "recurring_bills.csv"
+RULE_FIELDS = ["Category", "Amount", "Day", "Interval", "Start", "End"]
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def load_rules(data_dir):
+    """Loads the recurring bill rules stored next to the month files.
+
+    Each rule is a dict with Category, Amount, and either Day (day of month) or
+    Interval (days between bills), plus an optional Start and End date.
+    """
+    file_path = os.path.join(data_dir, RULES_FILE)
+    if not os.path.exists(file_path):
+        return []
+
+    rules = []
+    with open(file_path, newline='') as file:
+        for line_no, row in enumerate(csv.DictReader(file), start=2):
+            try:
+                rule = {
+                    "Category": row["Category"].strip(),
+                    "Amount": float(row["Amount"]),
+                    "Day": int(row["Day"]) if row.get("Day") else None,
+                    "Interval": int(row["Interval"]) if row.get("Interval") else None,
+                    "Start": _parse_date(row.get("Start")),
+                    "End": _parse_date(row.get("End")),
+                }
+            except (KeyError, TypeError, ValueError) as error:
+                raise ValueError(f"{file_path} line {line_no}: {error}") from error
+            if rule["Category"] not in CATEGORIES:
+                raise ValueError(f"{file_path} line {line_no}: unknown category {rule['Category']!r}")
+            if not rule["Day"] and not (rule["Interval"] and rule["Start"]):
+                raise ValueError(f"{file_path} line {line_no}: needs a Day, or an Interval with a Start")
+            if rule["Day"] is not None and not 1 <= rule["Day"] <= 31:
+                raise ValueError(f"{file_path} line {line_no}: Day must be between 1 and 31")
+            if rule["Interval"] is not None and rule["Interval"] < 1:
+                raise ValueError(f"{file_path} line {line_no}: Interval must be at least 1 day")
+            rules.append(rule)
+    return rules
+
+def save_rules(data_dir, rules):
+    """Writes the recurring bill rules next to the month files."""
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, RULES_FILE), 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=RULE_FIELDS)
+        writer.writeheader()
+        for rule in rules:
+            row = {field: ("" if rule.get(field) is None else rule[field]) for field in RULE_FIELDS}
+            for field in ("Start", "End"):
+                if isinstance(rule.get(field), date):
+                    row[field] = rule[field].strftime('%Y-%m-%d')
+            writer.writerow(row)
+
+def occurrences(rule, year, month):
+    """Returns the dates in the given month on which the rule bills."""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    start = max(first, rule["Start"] or first)
+    end = min(last, rule["End"] or last)
+    if start > end:
+        return []
+
+    if rule["Day"]:
+        bill_day = date(year, month, min(rule["Day"], last.day))  # Day 31 bills on the last day
+        return [bill_day] if start <= bill_day <= end else []
+
+    interval = timedelta(days=rule["Interval"])
+    skipped = max(0, -(-(start - rule["Start"]).days // rule["Interval"]))
+    day, dates = rule["Start"] + skipped * interval, []
+    while day <= end:
+        dates.append(day)
+        day += interval
+    return dates
+
+def scheduled_amounts(rules, year, month, since=None):
+    """Returns {date: {category: amount}} for every bill due in the month on or after `since`."""
+    changes = {}
+    for rule in rules:
+        for day in occurrences(rule, year, month):
+            if since and day < since:
+                continue
+            amounts = changes.setdefault(day.strftime('%Y-%m-%d'), {})
+            amounts[rule["Category"]] = amounts.get(rule["Category"], 0.0) + rule["Amount"]
+    return changes
+
+def create_month(file_path, year, month, rules, today=None):
+    """Writes a new month file in one pass, with the bills due from `today` (default today) filled in."""
+    days_in_month = calendar.monthrange(year, month)[1]
+    dates = [date(year, month, day) for day in range(1, days_in_month + 1)]
+    values = np.zeros((days_in_month, len(COLUMNS) - 2))
+    for day, amounts in scheduled_amounts(rules, year, month, today or date.today()).items():
+        row = int(day[-2:]) - 1
+        for category, amount in amounts.items():
+            values[row, COLUMNS.index(category) - 2] = amount
+    values[:, -2] = values[:, :-2].sum(axis=1)
+    values[:, -1] = values[:, -2] * AED_TO_INR
+    write_month(file_path, [d.strftime('%Y-%m-%d') for d in dates], [d.strftime('%A') for d in dates], values)
+
+def fill_month(file_path, year, month, rules, today=None):
+    """Writes the month's upcoming recurring bills into an existing month file in one batch.
+
+    Only bills due from `today` (default today) onwards are written, and only
+    into empty cells, so amounts the user entered are never overwritten and
+    filling a month twice is harmless. Returns the number of days written.
+    """
+    dates, _, values = read_month_arrays(file_path)
+    rows = {day: i for i, day in enumerate(dates)}
+    changes = {}
+    for day, amounts in scheduled_amounts(rules, year, month, today or date.today()).items():
+        for category, amount in amounts.items():
+            if day in rows:
+                current = values[rows[day], COLUMNS.index(category) - 2]
+                if current and not np.isnan(current):
+                    continue  # Already billed, or holds the user's own amount
+            changes.setdefault(day, {})[category] = amount
+    if changes:
+        update_days(file_path, changes)
+    return len(changes)
+
+def fill_year(data_dir, year, rules=None, today=None):
+    """Materializes the upcoming recurring bills into every month file of a year.
+
+    Missing months are created with their bills, existing ones are updated in
+    place; either way each month file is written at most once. Months that are
+    already over are left alone. Returns the number of days written.
+    """
+    rules = load_rules(data_dir) if rules is None else rules
+    today = today or date.today()
+    os.makedirs(data_dir, exist_ok=True)
+    written = 0
+    for month in range(1, 13):
+        if (year, month) < (today.year, today.month):
+            continue
+        month_name = datetime(year, month, 1).strftime('%B')
+        file_path = os.path.join(data_dir, f"{year}_{month_name}.csv")
+        if os.path.exists(file_path):
+            written += fill_month(file_path, year, month, rules, today)
+        else:
+            create_month(file_path, year, month, rules, today)
+            written += len(scheduled_amounts(rules, year, month, today))
+    return written